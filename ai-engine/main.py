@@ -1,23 +1,64 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
 from dotenv import load_dotenv
 import os
+import logging
 
 from services.image_classifier import classify_image
 from services.nlp_analyzer import analyze_complaint
 from services.priority_predictor import predict_priority
 from services.duplicate_detector import detect_duplicate
-from services.hotspot_analyzer import analyze_hotspots
+from services.hotspot_analyzer import analyze_hotspots, shutdown_executor
+from services.trend_aggregator import trend_aggregator, predictions_from_trends, SNAPSHOT_NAME
+from services.snapshot_store import SnapshotWriter, SnapshotError
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Snapshots of in-memory engine state
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "60"))
+
+trend_snapshot_writer = SnapshotWriter(
+    SNAPSHOT_NAME,
+    flush=trend_aggregator.flush,
+    refresh=trend_aggregator.refresh,
+    interval=SNAPSHOT_INTERVAL
+)
+
+def restore_snapshots():
+    """Map the trend snapshot as the aggregator's base, rebuilding it if it is unreadable"""
+    try:
+        trend_aggregator.attach(SNAPSHOT_DIR)
+        return
+    except SnapshotError as e:
+        logger.warning("Discarding trend snapshot: %s", e)
+
+    try:
+        trend_aggregator.flush(force=True)
+    except Exception:
+        logger.exception("Could not rebuild trend snapshot in %s", SNAPSHOT_DIR)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    restore_snapshots()
+    trend_snapshot_writer.start()
+    yield
+    trend_snapshot_writer.stop()
+    shutdown_executor()
+
 app = FastAPI(
     title="iCivic Guardian AI Engine",
     description="AI/ML microservice for civic issue analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -51,6 +92,11 @@ class DuplicateRequest(BaseModel):
 
 class HotspotRequest(BaseModel):
     issues: List[dict]
+    region: Optional[str] = None
+    grid_size: Optional[float] = Field(None, gt=0)
+
+class TrendIngestRequest(BaseModel):
+    issues: List[dict]
 
 class AnalysisResponse(BaseModel):
     category: str
@@ -128,12 +174,46 @@ async def detect_duplicate_endpoint(request: DuplicateRequest):
 
 @app.post("/get-hotspots")
 async def get_hotspots_endpoint(request: HotspotRequest):
-    """Analyze issue locations to find hotspots"""
+    """Analyze issue locations to find hotspots, optionally scoped to one region"""
     try:
-        result = analyze_hotspots(request.issues)
+        kwargs = {"grid_size": request.grid_size} if request.grid_size is not None else {}
+        # Clustering is CPU-bound; run it off the event loop
+        result = await asyncio.get_running_loop().run_in_executor(None, partial(
+            analyze_hotspots,
+            request.issues,
+            region=request.region,
+            trends=trend_aggregator,
+            **kwargs
+        ))
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/trends/ingest")
+async def ingest_trends_endpoint(request: TrendIngestRequest):
+    """Record newly created or resolved issues in the rolling trend windows"""
+    try:
+        updated = trend_aggregator.ingest(request.issues)
+        return {"received": len(request.issues), "updated": updated}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/trends")
+async def get_trends_endpoint(window: str = "week", category: Optional[str] = None, limit: int = Query(10, ge=1)):
+    """Areas whose issue counts are growing or shrinking over a rolling window"""
+    try:
+        trends = trend_aggregator.get_trends(window, category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    growing = [t for t in trends if t['trend'] == 'growing']
+    shrinking = [t for t in reversed(trends) if t['trend'] == 'shrinking']
+    return {
+        "window": window,
+        "growing": growing[:limit],
+        "shrinking": shrinking[:limit],
+        "predictions": predictions_from_trends(trends, window)[:limit]
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,22 +1,170 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import math
+import os
+import threading
 import numpy as np
 from sklearn.cluster import KMeans
-from collections import Counter
+from collections import Counter, defaultdict
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def analyze_hotspots(issues: List[Dict]) -> Dict:
+# Size of the automatic spatial grid (in degrees, ~55 km) used when an issue has no ward/city id.
+# Roughly city-sized so a fallback shard holds a whole metro area rather than slicing through it.
+GRID_CELL_DEGREES = float(os.getenv("HOTSPOT_GRID_DEGREES", "0.5"))
+
+# Grid-shard clusters whose centers are this close (in degrees) across a cell edge are merged
+CLUSTER_MERGE_DEGREES = 0.05
+
+# Ward/city shards with fewer issues are folded into their grid cells; clusters smaller
+# than MIN_CLUSTER_ISSUES are counted as isolated issues instead of reported as hotspots
+MIN_SHARD_ISSUES = 3
+MIN_CLUSTER_ISSUES = 2
+
+# Upper bound on clusters per region shard
+MAX_CLUSTERS_PER_REGION = 8
+
+# Below this many points the process pool costs more than it saves
+PARALLEL_MIN_POINTS = 2000
+
+# Pool size per uvicorn worker; by default the cores are split between the web workers
+HOTSPOT_WORKERS = int(os.getenv("HOTSPOT_WORKERS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _init_pool_worker():
+    """Keep BLAS/OpenMP single-threaded in pool processes; the pool already uses every core"""
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=1)
+
+def get_executor() -> ProcessPoolExecutor:
+    """Lazily create the shared process pool used for shard clustering"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=HOTSPOT_WORKERS, initializer=_init_pool_worker)
+        return _executor
+
+def shutdown_executor(executor: Optional[ProcessPoolExecutor] = None) -> None:
+    """Shut down the pool; with an executor given, only if it is still the current one"""
+    global _executor
+    with _executor_lock:
+        if _executor is None or (executor is not None and executor is not _executor):
+            return
+        pool, _executor = _executor, None
+    pool.shutdown(wait=executor is None, cancel_futures=True)
+
+def valid_coordinates(coordinates) -> bool:
+    """True for a [lng, lat, ...] sequence whose first two entries are finite numbers"""
+    if not isinstance(coordinates, (list, tuple)) or len(coordinates) < 2:
+        return False
+    return all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        for value in coordinates[:2]
+    )
+
+def get_cell(coordinates: List[float], grid_size: float = GRID_CELL_DEGREES) -> Tuple[int, int]:
+    """Spatial grid cell indices for a [lng, lat] pair"""
+    return (math.floor(coordinates[0] / grid_size), math.floor(coordinates[1] / grid_size))
+
+def cell_key(coordinates: List[float], grid_size: float = GRID_CELL_DEGREES, prefix: str = "grid") -> str:
+    """Key of the grid cell containing a [lng, lat] pair; grids of other sizes use their own prefix"""
+    cell_x, cell_y = get_cell(coordinates, grid_size)
+    return f"{prefix}:{cell_x}:{cell_y}"
+
+def get_region_key(issue: Dict, coordinates: List[float], grid_size: float = GRID_CELL_DEGREES) -> str:
+    """Region of an issue: explicit ward or city id, else its spatial grid cell"""
+    for field in ('ward', 'city'):
+        value = issue.get(field)
+        if value:
+            return f"{field}:{value}"
+    
+    return cell_key(coordinates, grid_size)
+
+def partition_issues(issues: List[Dict], grid_size: float = GRID_CELL_DEGREES) -> Dict[str, Tuple[List, List]]:
+    """Split issues with valid coordinates into per-region (coords, issue_data) shards"""
+    shards = defaultdict(lambda: ([], []))
+    
+    for issue in issues:
+        loc = issue.get('location', {})
+        if isinstance(loc, dict):
+            coordinates = loc.get('coordinates', [])
+            if valid_coordinates(coordinates):
+                coords, issue_data = shards[get_region_key(issue, coordinates, grid_size)]
+                coords.append([coordinates[0], coordinates[1]])  # [lng, lat]
+                issue_data.append({
+                    'category': issue.get('category', 'other'),
+                    'priority': issue.get('priority', 5),
+                    'status': issue.get('status', 'pending')
+                })
+    
+    return dict(shards)
+
+def fold_small_shards(shards: Dict[str, Tuple[List, List]], grid_size: float = GRID_CELL_DEGREES) -> Dict[str, Tuple[List, List]]:
+    """Move ward/city shards too small to cluster into the grid cells of their issues"""
+    folded = defaultdict(lambda: ([], []))
+    
+    for key, (coords, issue_data) in shards.items():
+        if key.startswith('grid:') or len(coords) >= MIN_SHARD_ISSUES:
+            folded[key][0].extend(coords)
+            folded[key][1].extend(issue_data)
+            continue
+        for point, data in zip(coords, issue_data):
+            target = folded[cell_key(point, grid_size)]
+            target[0].append(point)
+            target[1].append(data)
+    
+    return dict(folded)
+
+def choose_cluster_count(n_points: int) -> int:
+    """Adaptive cluster count for a shard, growing with the square root of its size"""
+    n_clusters = round(math.sqrt(n_points / 2))
+    return max(1, min(MAX_CLUSTERS_PER_REGION, n_clusters, n_points))
+
+def batch_shards(jobs: List[Tuple], n_batches: int) -> List[List[Tuple]]:
+    """Group shard jobs into at most n_batches lists of roughly equal point count"""
+    batches = [[] for _ in range(min(n_batches, len(jobs)))]
+    loads = [(0, i) for i in range(len(batches))]
+    
+    # Largest shards first, each onto the currently lightest batch
+    for job in sorted(jobs, key=lambda job: len(job[1]), reverse=True):
+        load, i = heapq.heappop(loads)
+        batches[i].append(job)
+        heapq.heappush(loads, (load + len(job[1]), i))
+    
+    return batches
+
+def analyze_hotspots(
+    issues: List[Dict],
+    region: Optional[str] = None,
+    grid_size: float = GRID_CELL_DEGREES,
+    trends=None
+) -> Dict:
     """
-    Analyze issue locations to identify hotspots using KMeans clustering.
+    Analyze issue locations to identify hotspots using region-sharded KMeans clustering.
+    
+    Issues are partitioned by ward/city id (or an automatic spatial grid cell),
+    each shard is clustered independently, and the results are merged and ranked.
     
     Args:
         issues: List of issues with location coordinates
+        region: Optional region key (e.g. "ward:12", "city:pune") to analyze only that shard;
+            without it, ward/city shards too small to cluster are folded into their grid cells
+        grid_size: Grid cell size in degrees for issues without a ward/city id
+        trends: Optional TrendAggregator; when given, predictions come from its growing cells
         
     Returns:
         - clusters: List of hotspot clusters with center coordinates
         - predictions: Predicted future problem areas
         - risk_zones: High-risk areas requiring attention
+        - isolated_issues: Issues left in clusters below MIN_CLUSTER_ISSUES (not hotspots)
+        - issues_without_location: Issues skipped for missing or invalid coordinates
     """
     
-    if not issues or len(issues) < 3:
+    if not issues:
         return {
             "clusters": [],
             "predictions": [],
@@ -24,37 +172,77 @@ def analyze_hotspots(issues: List[Dict]) -> Dict:
             "message": "Insufficient data for hotspot analysis"
         }
     
-    # Extract coordinates
-    coords = []
-    issue_data = []
+    shards = partition_issues(issues, grid_size)
+    issues_without_location = len(issues) - sum(len(coords) for coords, _ in shards.values())
+    if region is not None:
+        # An explicitly requested region is analyzed as-is, however small
+        shards = {region: shards[region]} if region in shards else {}
+    else:
+        shards = fold_small_shards(shards, grid_size)
     
-    for issue in issues:
-        loc = issue.get('location', {})
-        if isinstance(loc, dict):
-            coordinates = loc.get('coordinates', [])
-            if len(coordinates) >= 2:
-                coords.append([coordinates[0], coordinates[1]])  # [lng, lat]
-                issue_data.append({
-                    'category': issue.get('category', 'other'),
-                    'priority': issue.get('priority', 5),
-                    'status': issue.get('status', 'pending')
-                })
+    total_points = sum(len(coords) for coords, _ in shards.values())
     
-    if len(coords) < 3:
+    if total_points == 0:
         return {
             "clusters": [],
             "predictions": [],
             "risk_zones": [],
+            "issues_without_location": issues_without_location,
             "message": "Insufficient location data"
         }
     
-    coords_array = np.array(coords)
+    # Cluster each shard, in parallel batches when there is enough work to pay for it
+    jobs = [(key, coords, issue_data) for key, (coords, issue_data) in shards.items()]
+    clusters = None
+    if len(jobs) > 1 and total_points >= PARALLEL_MIN_POINTS and HOTSPOT_WORKERS > 1:
+        executor = get_executor()
+        try:
+            batch_results = executor.map(cluster_regions, batch_shards(jobs, HOTSPOT_WORKERS))
+            clusters = [cluster for result in batch_results for cluster in result]
+        except BrokenProcessPool:
+            # A pool process died; drop the pool so the next request gets a fresh one
+            shutdown_executor(executor)
+    if clusters is None:
+        clusters = cluster_regions(jobs)
     
-    # Determine optimal number of clusters (max 5 for visualization)
-    n_clusters = min(5, len(coords) // 2)
-    n_clusters = max(2, n_clusters)
+    clusters = merge_boundary_clusters(clusters)
+    isolated_issues = sum(c['issue_count'] for c in clusters if c['issue_count'] < MIN_CLUSTER_ISSUES)
+    clusters = [c for c in clusters if c['issue_count'] >= MIN_CLUSTER_ISSUES]
+    
+    # Sort clusters by risk level
+    clusters.sort(key=lambda x: x['avg_priority'] * x['issue_count'], reverse=True)
+    for i, cluster in enumerate(clusters):
+        cluster['id'] = i
+    
+    # Identify risk zones (top 3 highest risk clusters)
+    risk_zones = [c for c in clusters if c['risk_level'] in ['high', 'critical']][:3]
+    
+    # Generate predictions from temporal trends when available, else from current clusters
+    trend_predictions = None
+    if trends is not None:
+        cells = {trends.cell_name(c) for coords, _ in shards.values() for c in coords}
+        trend_predictions = trends.predict('month', cells=cells)
+    predictions = generate_predictions(clusters, trend_predictions)
+    
+    return {
+        "clusters": clusters,
+        "predictions": predictions,
+        "risk_zones": risk_zones,
+        "regions_analyzed": len(shards),
+        "total_issues_analyzed": total_points,
+        "isolated_issues": isolated_issues,
+        "issues_without_location": issues_without_location
+    }
+
+def cluster_regions(jobs: List[Tuple]) -> List[Dict]:
+    """Cluster a batch of (region, coords, issue_data) shards; one process pool task"""
+    return [cluster for job in jobs for cluster in cluster_region(*job)]
+
+def cluster_region(region: str, coords: List[List[float]], issue_data: List[Dict]) -> List[Dict]:
+    """Run KMeans on a single region shard and summarize each cluster"""
+    coords_array = np.array(coords)
+    n_clusters = choose_cluster_count(len(coords))
     
-    # Perform KMeans clustering
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
     labels = kmeans.fit_predict(coords_array)
     
@@ -79,6 +267,7 @@ def analyze_hotspots(issues: List[Dict]) -> Dict:
         
         clusters.append({
             "id": i,
+            "region": region,
             "center": {
                 "lng": float(center[0]),
                 "lat": float(center[1])
@@ -91,20 +280,78 @@ def analyze_hotspots(issues: List[Dict]) -> Dict:
             "risk_level": calculate_risk_level(avg_priority, int(sum(cluster_mask)), pending_count)
         })
     
-    # Sort clusters by risk level
-    clusters.sort(key=lambda x: x['avg_priority'] * x['issue_count'], reverse=True)
+    return clusters
+
+def merge_boundary_clusters(clusters: List[Dict], radius: float = CLUSTER_MERGE_DEGREES) -> List[Dict]:
+    """
+    Merge clusters from different grid shards whose centers lie within radius.
     
-    # Identify risk zones (top 3 highest risk clusters)
-    risk_zones = [c for c in clusters if c['risk_level'] in ['high', 'critical']][:3]
+    A hotspot straddling a grid cell edge is otherwise split in two and its
+    risk understated. Ward/city shards are real boundaries and are left alone.
+    """
+    grid_clusters = [c for c in clusters if c['region'].startswith('grid:')]
+    merged = [c for c in clusters if not c['region'].startswith('grid:')]
+    
+    # Union-find over grid clusters, using a spatial hash of radius-sized buckets
+    parent = list(range(len(grid_clusters)))
     
-    # Generate predictions (simplified future hotspot prediction)
-    predictions = generate_predictions(clusters)
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    buckets = defaultdict(list)
+    for i, cluster in enumerate(grid_clusters):
+        bx = math.floor(cluster['center']['lng'] / radius)
+        by = math.floor(cluster['center']['lat'] / radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in buckets.get((bx + dx, by + dy), []):
+                    other = grid_clusters[j]
+                    if other['region'] == cluster['region']:
+                        continue
+                    distance = math.hypot(
+                        cluster['center']['lng'] - other['center']['lng'],
+                        cluster['center']['lat'] - other['center']['lat']
+                    )
+                    if distance <= radius:
+                        parent[find(i)] = find(j)
+        buckets[(bx, by)].append(i)
+    
+    groups = defaultdict(list)
+    for i, cluster in enumerate(grid_clusters):
+        groups[find(i)].append(cluster)
+    
+    for group in groups.values():
+        merged.append(group[0] if len(group) == 1 else combine_clusters(group))
+    
+    return merged
+
+def combine_clusters(group: List[Dict]) -> Dict:
+    """Combine cluster summaries, weighting centers and priority by issue count"""
+    issue_count = sum(c['issue_count'] for c in group)
+    pending_count = sum(c['pending_issues'] for c in group)
+    category_counts = Counter()
+    for c in group:
+        category_counts.update(c['category_distribution'])
+    
+    avg_priority = sum(c['avg_priority'] * c['issue_count'] for c in group) / issue_count
+    largest = max(group, key=lambda c: c['issue_count'])
     
     return {
-        "clusters": clusters,
-        "predictions": predictions,
-        "risk_zones": risk_zones,
-        "total_issues_analyzed": len(coords)
+        "id": largest['id'],
+        "region": largest['region'],
+        "center": {
+            "lng": sum(c['center']['lng'] * c['issue_count'] for c in group) / issue_count,
+            "lat": sum(c['center']['lat'] * c['issue_count'] for c in group) / issue_count
+        },
+        "issue_count": issue_count,
+        "dominant_category": category_counts.most_common(1)[0][0],
+        "category_distribution": dict(category_counts),
+        "avg_priority": round(float(avg_priority), 1),
+        "pending_issues": pending_count,
+        "risk_level": calculate_risk_level(avg_priority, issue_count, pending_count)
     }
 
 def calculate_risk_level(avg_priority: float, issue_count: int, pending_count: int) -> str:
@@ -120,8 +367,11 @@ def calculate_risk_level(avg_priority: float, issue_count: int, pending_count: i
     else:
         return "low"
 
-def generate_predictions(clusters: List[Dict]) -> List[Dict]:
-    """Generate predicted future problem areas based on current patterns"""
+def generate_predictions(clusters: List[Dict], trend_predictions: Optional[List[Dict]] = None) -> List[Dict]:
+    """Generate predicted future problem areas, preferring trend-based projections"""
+    if trend_predictions:
+        return trend_predictions[:3]
+    
     predictions = []
     
     for cluster in clusters:
@@ -0,0 +1,333 @@
+from typing import Dict, Optional, Callable, NamedTuple
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: writes stay atomic but are not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout (manifest fields, file naming) changes
+FORMAT_VERSION = 1
+
+# Generations kept on disk so a worker mid-load never loses its files
+KEEP_GENERATIONS = 2
+
+# Temp files older than this are leftovers from a writer that crashed mid-save
+STALE_TEMP_SECONDS = 3600
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is corrupt or was written by an incompatible version"""
+
+# Array names become file names, so only plain identifiers are accepted from a manifest
+ARRAY_NAME = re.compile(r"^[A-Za-z0-9_]+$")
+
+class Snapshot(NamedTuple):
+    """A loaded generation: read-only memory-mapped arrays plus manifest metadata"""
+    generation: str
+    arrays: Dict[str, np.ndarray]
+    meta: Dict
+    checksums: Dict[str, str]
+
+def _checksum(array: np.ndarray) -> str:
+    # Hash the raw buffer in place so a memory-mapped array is not copied into memory
+    data = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+    return hashlib.sha256(data).hexdigest()
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def snapshot_lock(directory: str, name: str):
+    """Exclusive lock on <directory>/<name>/.lock serializing writers across processes"""
+    root = os.path.join(directory, name)
+    os.makedirs(root, exist_ok=True)
+
+    with open(os.path.join(root, ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def save_snapshot(
+    directory: str,
+    name: str,
+    arrays: Dict[str, np.ndarray],
+    meta: Dict,
+    version: int,
+    lock: bool = True
+) -> str:
+    """
+    Atomically write a snapshot of flat NumPy arrays plus a JSON manifest.
+
+    Layout: <directory>/<name>/<generation>/{manifest.json, <array>.npy} with a
+    CURRENT file naming the live generation. The generation is fully written
+    and fsynced before CURRENT is swapped with os.replace, so readers see
+    either the old snapshot or the new one, never a partial write. Pass
+    lock=False when the caller already holds snapshot_lock.
+    """
+    if not lock:
+        return _write_snapshot(directory, name, arrays, meta, version)
+    with snapshot_lock(directory, name):
+        return _write_snapshot(directory, name, arrays, meta, version)
+
+def _write_snapshot(
+    directory: str,
+    name: str,
+    arrays: Dict[str, np.ndarray],
+    meta: Dict,
+    version: int
+) -> str:
+    """Write a new generation and publish it; the caller holds snapshot_lock"""
+    root = os.path.join(directory, name)
+
+    generation = f"gen-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = os.path.join(root, f".tmp-{generation}")
+    os.makedirs(tmp_dir)
+
+    try:
+        entries = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            path = os.path.join(tmp_dir, f"{key}.npy")
+            np.save(path, array, allow_pickle=False)
+            _fsync_path(path)
+            entries[key] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "sha256": _checksum(array)
+            }
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "name": name,
+            "version": version,
+            "created_at": time.time(),
+            "arrays": entries,
+            "meta": meta
+        }
+        manifest_path = os.path.join(tmp_dir, "manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(tmp_dir, os.path.join(root, generation))
+        # Persist the generation's directory entry before CURRENT can point at it
+        _fsync_path(root)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(root, f".CURRENT-{generation}")
+    try:
+        with open(pointer_tmp, "w") as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(root, "CURRENT"))
+        _fsync_path(root)
+    except Exception:
+        if os.path.exists(pointer_tmp):
+            os.remove(pointer_tmp)
+        raise
+
+    _remove_old_generations(root, generation)
+    return os.path.join(root, generation)
+
+def _remove_old_generations(root: str, current: str) -> None:
+    """Delete all but the newest generations, plus temp files abandoned by crashed writers"""
+    entries = os.listdir(root)
+    generations = sorted(
+        (entry for entry in entries if entry.startswith("gen-")),
+        key=lambda entry: int(entry.split("-")[1])
+    )
+    older = [g for g in generations if g != current]
+    for entry in older[:max(len(older) - (KEEP_GENERATIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+    cutoff = time.time() - STALE_TEMP_SECONDS
+    for entry in entries:
+        if not entry.startswith((".tmp-", ".CURRENT-")):
+            continue
+        path = os.path.join(root, entry)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+        except OSError:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def current_generation(directory: str, name: str) -> Optional[str]:
+    """Generation named by CURRENT, or None if there is no snapshot yet (a single small read)"""
+    try:
+        with open(os.path.join(directory, name, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        raise SnapshotError(f"Unreadable CURRENT pointer for snapshot '{name}': {e}")
+
+def _manifest_error(name: str, detail: str) -> SnapshotError:
+    return SnapshotError(f"Malformed manifest for snapshot '{name}': {detail}")
+
+def _check_manifest(name: str, manifest) -> None:
+    """Reject manifests that are valid JSON but not shaped like one we wrote"""
+    if not isinstance(manifest, dict):
+        raise _manifest_error(name, "not an object")
+    if not isinstance(manifest.get("arrays"), dict):
+        raise _manifest_error(name, "'arrays' is not an object")
+    if not isinstance(manifest.get("meta", {}), dict):
+        raise _manifest_error(name, "'meta' is not an object")
+
+    for key, entry in manifest["arrays"].items():
+        if not ARRAY_NAME.match(key):
+            raise _manifest_error(name, f"invalid array name {key!r}")
+        if not isinstance(entry, dict):
+            raise _manifest_error(name, f"entry for '{key}' is not an object")
+        shape = entry.get("shape")
+        if (
+            not isinstance(entry.get("dtype"), str)
+            or not isinstance(entry.get("sha256"), str)
+            or not isinstance(shape, list)
+            or not all(isinstance(n, int) and not isinstance(n, bool) and n >= 0 for n in shape)
+        ):
+            raise _manifest_error(name, f"entry for '{key}' needs dtype, shape and sha256")
+
+def load_snapshot(
+    directory: str,
+    name: str,
+    version: int,
+    verify: bool = False
+) -> Optional[Snapshot]:
+    """
+    Open the live snapshot with every array memory-mapped read-only.
+
+    Only the manifest and the .npy headers are read, so opening is cheap
+    regardless of snapshot size and every worker shares the same page cache.
+    Checksums are compared only with `verify`, which reads every page; call
+    verify_snapshot later to check a snapshot opened without it.
+
+    Returns None when no snapshot exists, and raises SnapshotError when it is
+    malformed or was written with a different format/component version.
+    """
+    generation = current_generation(directory, name)
+    if generation is None:
+        return None
+    if not generation.startswith("gen-") or os.sep in generation:
+        raise SnapshotError(f"CURRENT for snapshot '{name}' names an invalid generation {generation!r}")
+    generation_dir = os.path.join(directory, name, generation)
+
+    try:
+        with open(os.path.join(generation_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable manifest for snapshot '{name}': {e}")
+
+    _check_manifest(name, manifest)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot '{name}' has format version {manifest.get('format_version')}, expected {FORMAT_VERSION}")
+    if manifest.get("version") != version:
+        raise SnapshotError(f"Snapshot '{name}' has version {manifest.get('version')}, expected {version}")
+
+    arrays = {}
+    checksums = {}
+    for key, entry in manifest["arrays"].items():
+        try:
+            array = np.load(os.path.join(generation_dir, f"{key}.npy"), mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Unreadable array '{key}' in snapshot '{name}': {e}")
+
+        if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise SnapshotError(f"Array '{key}' in snapshot '{name}' does not match its manifest")
+
+        arrays[key] = array
+        checksums[key] = entry["sha256"]
+
+    snapshot = Snapshot(generation, arrays, manifest.get("meta", {}), checksums)
+    if verify:
+        verify_snapshot(snapshot, name)
+    return snapshot
+
+def verify_snapshot(snapshot: Snapshot, name: str) -> None:
+    """Compare every array with its manifest checksum, raising SnapshotError on a mismatch"""
+    for key, array in snapshot.arrays.items():
+        if _checksum(array) != snapshot.checksums[key]:
+            raise SnapshotError(f"Checksum mismatch for array '{key}' in snapshot '{name}' ({snapshot.generation})")
+
+class SnapshotWriter:
+    """
+    Background thread that keeps a component in sync with its snapshot.
+
+    Every `poll` seconds it calls `refresh`, which should pick up generations
+    published by other workers (a cheap CURRENT check) and finish any lazy
+    checksum verification. Every `interval` seconds it calls `flush`, which
+    should persist unsaved changes and return True if it wrote a snapshot.
+    Exceptions are logged, so a bad snapshot on disk never stops the loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[], bool],
+        refresh: Optional[Callable[[], bool]] = None,
+        interval: float = 60.0,
+        poll: float = 5.0
+    ):
+        self.name = name
+        self.flush = flush
+        self.refresh = refresh
+        self.interval = interval
+        self.poll = min(poll, interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and flush any unsaved changes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._call(self.flush, "write")
+
+    def _call(self, step: Callable[[], bool], action: str) -> None:
+        try:
+            step()
+        except Exception:
+            logger.exception("Failed to %s snapshot '%s'", action, self.name)
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.interval
+        while not self._stop.wait(self.poll):
+            if self.refresh is not None:
+                self._call(self.refresh, "refresh")
+            if time.monotonic() >= next_flush:
+                self._call(self.flush, "write")
+                next_flush = time.monotonic() + self.interval
@@ -0,0 +1,678 @@
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
+from datetime import datetime, timezone
+from collections import Counter
+import logging
+import threading
+import numpy as np
+
+from services.hotspot_analyzer import get_cell, cell_key, valid_coordinates
+from services.snapshot_store import (
+    Snapshot, SnapshotError, current_generation, load_snapshot, save_snapshot, snapshot_lock, verify_snapshot
+)
+
+logger = logging.getLogger(__name__)
+
+# Rolling window sizes in days
+WINDOW_DAYS = {
+    'day': 1,
+    'week': 7,
+    'month': 30
+}
+
+# Trend cells are finer than hotspot shards so growth is localized to neighbourhoods.
+# They get their own key prefix so they are never mistaken for hotspot "grid:" regions.
+TREND_CELL_DEGREES = 0.1
+TREND_CELL_PREFIX = "trend"
+
+# Statuses that close an issue; rejected reports leave the open backlog just like resolved ones
+CLOSED_STATUSES = ('resolved', 'rejected')
+
+# Buckets older than this are dropped (current + previous month window of completed days)
+RETENTION_DAYS = 2 * max(WINDOW_DAYS.values()) + 1
+
+# Bump when the snapshot array layout of TrendSnapshot changes
+SNAPSHOT_VERSION = 4
+
+SNAPSHOT_NAME = "trends"
+
+# Integer arrays of a trend snapshot and their number of dimensions
+SNAPSHOT_INT_ARRAYS = {
+    "keys": 2,
+    "days": 1,
+    "day_offsets": 1,
+    "day_keys": 1,
+    "day_opened": 1,
+    "day_closed": 1,
+    "event_days": 1,
+    "event_cells": 1,
+    "status_seq": 1,
+    "status_days": 1
+}
+SNAPSHOT_ID_ARRAYS = ("event_keys", "status_ids")
+
+# Separates issue id and transition number in event keys
+EVENT_KEY_SEPARATOR = b"\x1f"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse an ISO timestamp (as serialized by MongoDB/Express) into an aware datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def day_index(moment: datetime) -> int:
+    """Whole days since the Unix epoch"""
+    return (moment - EPOCH).days
+
+def _event_key(issue_id: str, seq: int) -> bytes:
+    return issue_id.encode('utf-8') + EVENT_KEY_SEPARATOR + str(seq).encode('ascii')
+
+def _find(sorted_keys: np.ndarray, value: bytes) -> int:
+    """Binary search a sorted bytes array, returning the index of `value` or -1"""
+    if not len(sorted_keys) or len(value) > sorted_keys.dtype.itemsize:
+        return -1
+    i = int(np.searchsorted(sorted_keys, value))
+    return i if i < len(sorted_keys) and sorted_keys[i] == value else -1
+
+class TrendSnapshot:
+    """
+    Trend aggregates served straight from a memory-mapped snapshot.
+
+    Daily counts are stored CSR-style: rows day_offsets[i]:day_offsets[i + 1]
+    belong to days[i], and each row holds a (cell, category) index into
+    `keys` with its opened and closed counts. A window query slices the rows
+    of its days, so it only touches those pages, and all workers share them
+    through the page cache. Event and status tables are sorted by id and
+    looked up by binary search.
+
+    Opening validates the manifest metadata, dtypes, shapes and the small
+    keys/days index in O(number of cells + days); `check` validates the
+    rest and is meant to run in the background along with the checksums.
+    """
+
+    def __init__(self, snapshot: Snapshot, grid_size: float):
+        arrays, meta = snapshot.arrays, snapshot.meta
+
+        if meta.get("grid_size") != grid_size:
+            raise SnapshotError(f"Snapshot grid size {meta.get('grid_size')} does not match {grid_size}")
+        categories = meta.get("categories")
+        if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+            raise SnapshotError("Snapshot manifest has no category list")
+        pruned_through = meta.get("pruned_through")
+        if pruned_through is not None and (not isinstance(pruned_through, int) or isinstance(pruned_through, bool)):
+            raise SnapshotError("Snapshot pruning horizon is not a day index")
+
+        missing = [key for key in (*SNAPSHOT_INT_ARRAYS, *SNAPSHOT_ID_ARRAYS) if key not in arrays]
+        if missing:
+            raise SnapshotError(f"Snapshot is missing arrays {missing}")
+        for key, ndim in SNAPSHOT_INT_ARRAYS.items():
+            if arrays[key].dtype.kind != 'i' or arrays[key].ndim != ndim:
+                raise SnapshotError(f"Snapshot array '{key}' must be a {ndim}-D integer array, got {arrays[key].dtype}")
+        for key in SNAPSHOT_ID_ARRAYS:
+            if arrays[key].dtype.kind != 'S' or arrays[key].ndim != 1:
+                raise SnapshotError(f"Snapshot array '{key}' must be a 1-D bytes array, got {arrays[key].dtype}")
+
+        keys = arrays["keys"]
+        days = arrays["days"]
+        offsets = arrays["day_offsets"]
+        rows = len(arrays["day_keys"])
+        if (
+            keys.shape[1] != 3
+            or len(offsets) != len(days) + 1
+            or not rows == len(arrays["day_opened"]) == len(arrays["day_closed"])
+            or not len(arrays["event_keys"]) == len(arrays["event_days"]) == len(arrays["event_cells"])
+            or not len(arrays["status_ids"]) == len(arrays["status_seq"]) == len(arrays["status_days"])
+        ):
+            raise SnapshotError("Snapshot arrays have inconsistent shapes")
+
+        offsets = np.asarray(offsets)
+        if offsets[0] != 0 or offsets[-1] != rows or np.any(np.diff(offsets) < 0) or np.any(np.diff(days) <= 0):
+            raise SnapshotError("Snapshot day index is not ordered")
+
+        key_rows = np.asarray(keys).tolist()
+        if any(not 0 <= category < len(categories) for _, _, category in key_rows):
+            raise SnapshotError("Snapshot keys reference unknown categories")
+
+        self.snapshot = snapshot
+        self.generation = snapshot.generation
+        self.arrays = arrays
+        self.pruned_through = pruned_through
+        self.keys = [((cell_x, cell_y), categories[category]) for cell_x, cell_y, category in key_rows]
+
+    def window_counts(self, start: int, end: int) -> Tuple[Counter, Counter]:
+        """Opened and closed counts per (cell, category) over the days in (start, end]"""
+        days = self.arrays["days"]
+        offsets = self.arrays["day_offsets"]
+        lo = int(offsets[np.searchsorted(days, start, side='right')])
+        hi = int(offsets[np.searchsorted(days, end, side='right')])
+
+        opened, closed = Counter(), Counter()
+        if lo >= hi:
+            return opened, closed
+
+        rows = np.asarray(self.arrays["day_keys"][lo:hi])
+        if rows.min() < 0 or rows.max() >= len(self.keys):
+            raise SnapshotError(f"Snapshot {self.generation} has day rows outside its key table")
+
+        unique, inverse = np.unique(rows, return_inverse=True)
+        opened_counts = np.bincount(inverse, weights=self.arrays["day_opened"][lo:hi]).astype(np.int64)
+        closed_counts = np.bincount(inverse, weights=self.arrays["day_closed"][lo:hi]).astype(np.int64)
+        for key, o, c in zip(unique.tolist(), opened_counts.tolist(), closed_counts.tolist()):
+            if o:
+                opened[self.keys[key]] = o
+            if c:
+                closed[self.keys[key]] = c
+        return opened, closed
+
+    def status(self, issue_id: str) -> Optional[Tuple[int, int]]:
+        """(last transition, its day) recorded for an issue, if any"""
+        i = _find(self.arrays["status_ids"], issue_id.encode('utf-8'))
+        if i < 0:
+            return None
+        return int(self.arrays["status_seq"][i]), int(self.arrays["status_days"][i])
+
+    def has_event(self, issue_id: str, seq: int) -> bool:
+        return _find(self.arrays["event_keys"], _event_key(issue_id, seq)) >= 0
+
+    def events(self) -> Iterator[Tuple[Tuple[str, int], Tuple[int, Tuple[int, int], str]]]:
+        """Decode every event; reads the whole event table, so only the writer calls it"""
+        for key, day, cell in zip(
+            self.arrays["event_keys"].tolist(),
+            self.arrays["event_days"].tolist(),
+            self.arrays["event_cells"].tolist()
+        ):
+            issue_id, _, seq = key.rpartition(EVENT_KEY_SEPARATOR)
+            try:
+                cell_xy, category = self.keys[cell]
+                yield (issue_id.decode('utf-8'), int(seq)), (day, cell_xy, category)
+            except (IndexError, UnicodeDecodeError, ValueError) as e:
+                raise SnapshotError(f"Snapshot {self.generation} has an invalid event {key!r}: {e}")
+
+    def statuses(self) -> Iterator[Tuple[str, Tuple[int, int]]]:
+        """Decode every issue status; reads the whole status table"""
+        for issue_id, seq, day in zip(
+            self.arrays["status_ids"].tolist(),
+            self.arrays["status_seq"].tolist(),
+            self.arrays["status_days"].tolist()
+        ):
+            try:
+                yield issue_id.decode('utf-8'), (seq, day)
+            except UnicodeDecodeError as e:
+                raise SnapshotError(f"Snapshot {self.generation} has an invalid issue id: {e}")
+
+    def check(self) -> None:
+        """Validate the large arrays that opening skips; reads every page"""
+        arrays = self.arrays
+        key_count = len(self.keys)
+        for key in ("day_keys", "event_cells"):
+            column = arrays[key]
+            if len(column) and (column.min() < 0 or column.max() >= key_count):
+                raise SnapshotError(f"Snapshot {self.generation} array '{key}' is outside its key table")
+        for key in SNAPSHOT_ID_ARRAYS:
+            ids = arrays[key]
+            if len(ids) > 1 and not np.all(ids[1:] > ids[:-1]):
+                raise SnapshotError(f"Snapshot {self.generation} array '{key}' is not sorted")
+        if len(arrays["status_seq"]) and arrays["status_seq"].min() < 0:
+            raise SnapshotError(f"Snapshot {self.generation} has negative transitions")
+
+def build_snapshot_arrays(
+    events: Dict[Tuple[str, int], Tuple[int, Tuple[int, int], str]],
+    status: Dict[str, Tuple[int, int]],
+    grid_size: float,
+    pruned_through: Optional[int]
+) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """Lay out event and status tables in the TrendSnapshot format"""
+    categories = sorted({category for _, _, category in events.values()})
+    category_index = {category: i for i, category in enumerate(categories)}
+
+    key_index: Dict[Tuple, int] = {}
+    opened, closed = Counter(), Counter()
+    event_rows = []
+    for (issue_id, seq), (day, cell, category) in events.items():
+        key = key_index.setdefault((cell, category), len(key_index))
+        (closed if seq % 2 else opened)[(day, key)] += 1
+        event_rows.append((_event_key(issue_id, seq), day, key))
+    event_rows.sort()
+
+    day_rows = sorted(set(opened) | set(closed))
+    day_column = np.array([day for day, _ in day_rows], dtype=np.int64)
+    days = np.unique(day_column)
+    status_rows = sorted((issue_id.encode('utf-8'), seq, day) for issue_id, (seq, day) in status.items())
+
+    arrays = {
+        "keys": np.array(
+            [(cell[0], cell[1], category_index[category]) for cell, category in key_index],
+            dtype=np.int64
+        ).reshape(-1, 3),
+        "days": days,
+        "day_offsets": np.searchsorted(day_column, np.append(days, days[-1] + 1 if len(days) else 0)).astype(np.int64),
+        "day_keys": np.array([key for _, key in day_rows], dtype=np.int64),
+        "day_opened": np.array([opened[row] for row in day_rows], dtype=np.int64),
+        "day_closed": np.array([closed[row] for row in day_rows], dtype=np.int64),
+        "event_keys": np.array([row[0] for row in event_rows], dtype='S'),
+        "event_days": np.array([row[1] for row in event_rows], dtype=np.int64),
+        "event_cells": np.array([row[2] for row in event_rows], dtype=np.int64),
+        "status_ids": np.array([row[0] for row in status_rows], dtype='S'),
+        "status_seq": np.array([row[1] for row in status_rows], dtype=np.int64),
+        "status_days": np.array([row[2] for row in status_rows], dtype=np.int64)
+    }
+    meta = {
+        "grid_size": grid_size,
+        "categories": categories,
+        "pruned_through": pruned_through
+    }
+    return arrays, meta
+
+class TrendAggregator:
+    """
+    Time-bucketed spatial aggregator for issue trends.
+
+    State is a read-only TrendSnapshot `base`, memory-mapped from the latest
+    snapshot generation, plus an in-memory delta: one Counter of
+    (cell, category) -> count per day for opened and closed events that are
+    not in the base yet. Queries add the two, reading only the day rows
+    inside their window, so startup just maps the snapshot and never
+    replays or rescans the issue history.
+
+    Each issue's status changes are numbered: transition 0 opens it, odd
+    transitions close it and later even ones reopen it. Events are keyed by
+    (issue id, transition), so a worker writing a snapshot can union its
+    delta with what other workers already published without double counting.
+    """
+
+    def __init__(self, grid_size: float = TREND_CELL_DEGREES):
+        self.grid_size = grid_size
+        self.base: Optional[TrendSnapshot] = None
+        # Checksums of a base opened lazily are compared later by verify()
+        self.base_verified = True
+        self.opened: Dict[int, Counter] = {}
+        self.resolved: Dict[int, Counter] = {}
+        # (issue id, transition) -> (day, cell, category) for events not in the base
+        self.events: Dict[Tuple[str, int], Tuple[int, Tuple[int, int], str]] = {}
+        # issue id -> (last transition, its day) when newer than the base
+        self.status: Dict[str, Tuple[int, int]] = {}
+        self.pruned_through: Optional[int] = None
+        self.directory: Optional[str] = None
+        self.rejected_generation: Optional[str] = None
+        # Set when the delta holds changes the snapshot on disk lacks
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def cell_name(self, coordinates: List[float]) -> str:
+        """Name of the trend cell containing a [lng, lat] pair"""
+        return cell_key(coordinates, self.grid_size, TREND_CELL_PREFIX)
+
+    def record_issue(self, issue: Dict, now: Optional[datetime] = None) -> bool:
+        """
+        Apply an issue to the aggregates.
+
+        New issues count as opened on their createdAt day. Every transition to
+        a closed status counts on its resolvedAt (or updatedAt) day, and every
+        reopen counts as opened again on its updatedAt day. Issues without an
+        id or valid coordinates are skipped, as are issues whose only event
+        falls before the retention horizon. Returns True if anything changed.
+        """
+        loc = issue.get('location', {})
+        coordinates = loc.get('coordinates', []) if isinstance(loc, dict) else []
+        issue_id = issue.get('id') or issue.get('_id')
+        if not valid_coordinates(coordinates) or not issue_id:
+            return False
+
+        now = now or datetime.now(timezone.utc)
+        horizon = day_index(now) - RETENTION_DAYS
+
+        issue_id = str(issue_id)
+        is_closed = issue.get('status') in CLOSED_STATUSES
+        key = (get_cell(coordinates, self.grid_size), str(issue.get('category', 'other')))
+
+        with self.lock:
+            if self.pruned_through is None or horizon > self.pruned_through:
+                self._prune(horizon)
+
+            previous = self._get_status(issue_id)
+            transitions = []
+
+            if previous is None:
+                created = parse_timestamp(issue.get('createdAt')) or now
+                transitions.append((0, day_index(created)))
+                if is_closed:
+                    closed_at = parse_timestamp(issue.get('resolvedAt') or issue.get('updatedAt')) or now
+                    transitions.append((1, day_index(closed_at)))
+            else:
+                was_closed = previous[0] % 2 == 1
+                if was_closed and not is_closed:
+                    reopened_at = parse_timestamp(issue.get('updatedAt')) or now
+                    transitions.append((previous[0] + 1, day_index(reopened_at)))
+                elif is_closed and not was_closed:
+                    closed_at = parse_timestamp(issue.get('resolvedAt') or issue.get('updatedAt')) or now
+                    transitions.append((previous[0] + 1, day_index(closed_at)))
+
+            if not transitions:
+                return False
+
+            added = [self._add_event(issue_id, seq, day, key) for seq, day in transitions]
+            if previous is None and not any(added):
+                # Entirely before the horizon; nothing to count or remember
+                return False
+
+            self.status[issue_id] = transitions[-1]
+            self.dirty = True
+            return True
+
+    def ingest(self, issues: Iterable[Dict], now: Optional[datetime] = None) -> int:
+        """Apply a batch of issues, returning how many changed the aggregates"""
+        return sum(1 for issue in issues if isinstance(issue, dict) and self.record_issue(issue, now))
+
+    def _get_status(self, issue_id: str) -> Optional[Tuple[int, int]]:
+        """Latest status from the delta, falling back to the base; caller holds the lock"""
+        status = self.status.get(issue_id)
+        if status is None and self.base is not None:
+            status = self.base.status(issue_id)
+            if status is not None and self.pruned_through is not None and status[1] <= self.pruned_through:
+                return None
+        return status
+
+    def _add_event(self, issue_id: str, seq: int, day: int, key: Tuple) -> bool:
+        """Count a transition once; events at or before the pruning horizon are ignored"""
+        event = (issue_id, seq)
+        if event in self.events or (self.pruned_through is not None and day <= self.pruned_through):
+            return False
+        if self.base is not None and self.base.has_event(issue_id, seq):
+            return False
+
+        self._count_event(event, (day, key[0], key[1]))
+        return True
+
+    def _count_event(self, event: Tuple[str, int], value: Tuple[int, Tuple[int, int], str]) -> None:
+        day, cell, category = value
+        self.events[event] = value
+        buckets = self.resolved if event[1] % 2 else self.opened
+        buckets.setdefault(day, Counter())[(cell, category)] += 1
+
+    def _prune(self, horizon: int) -> None:
+        """Drop delta buckets, events and statuses that have fallen out of every window (once per day)"""
+        for buckets in (self.opened, self.resolved):
+            for day in [d for d in buckets if d <= horizon]:
+                del buckets[day]
+        for event in [e for e, (day, _, _) in self.events.items() if day <= horizon]:
+            del self.events[event]
+        for issue_id in [i for i, (_, day) in self.status.items() if day <= horizon]:
+            del self.status[issue_id]
+        self.pruned_through = horizon
+
+    def _window_counts(self, buckets: Dict[int, Counter], start: int, end: int) -> Counter:
+        """Sum the delta day buckets in (start, end]"""
+        total = Counter()
+        for day in range(start + 1, end + 1):
+            bucket = buckets.get(day)
+            if bucket:
+                total.update(bucket)
+        return total
+
+    def attach(self, directory: str) -> bool:
+        """
+        Serve the snapshot in `directory` as the base and write future snapshots there.
+
+        Only maps the arrays; checksums are compared later by verify(). Raises
+        SnapshotError if the snapshot is malformed, leaving the aggregator
+        empty but attached so the next flush replaces it.
+        """
+        self.directory = directory
+        self.dirty = True
+        snapshot = load_snapshot(directory, SNAPSHOT_NAME, SNAPSHOT_VERSION)
+        if snapshot is None:
+            return False
+        self._rebase(TrendSnapshot(snapshot, self.grid_size), verified=False)
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Switch to a generation another worker published and verify a lazily opened base.
+
+        Costs one read of CURRENT when nothing changed. Returns True if the base changed.
+        """
+        if self.directory is None:
+            return False
+
+        changed = False
+        generation = current_generation(self.directory, SNAPSHOT_NAME)
+        base = self.base
+        if generation not in (None, self.rejected_generation) and (base is None or generation != base.generation):
+            try:
+                snapshot = load_snapshot(self.directory, SNAPSHOT_NAME, SNAPSHOT_VERSION)
+                if snapshot is not None:
+                    self._rebase(TrendSnapshot(snapshot, self.grid_size), verified=False)
+                    changed = True
+            except SnapshotError as e:
+                # Keep serving the current base; the next flush overwrites the bad generation
+                logger.warning("Ignoring trend snapshot %s: %s", generation, e)
+                self.rejected_generation = generation
+                self.dirty = True
+
+        self.verify()
+        return changed
+
+    def verify(self) -> bool:
+        """Compare the base's checksums and large arrays if that was deferred; drop it if corrupt"""
+        base = self.base
+        if base is None or self.base_verified:
+            return True
+
+        try:
+            verify_snapshot(base.snapshot, SNAPSHOT_NAME)
+            base.check()
+        except SnapshotError as e:
+            self._drop_base(base, e)
+            return False
+
+        with self.lock:
+            if self.base is base:
+                self.base_verified = True
+        return True
+
+    def flush(self, now: Optional[datetime] = None, force: bool = False) -> bool:
+        """
+        Write base + delta as a new generation if the delta has unsaved changes.
+
+        Runs under snapshot_lock: a generation published by another worker is
+        verified and adopted as the base first, so the write is a union and
+        never drops their events. The written generation then becomes the
+        base and the delta shrinks to whatever arrived during the write.
+        """
+        if self.directory is None or not (self.dirty or force):
+            return False
+
+        self.verify()
+        with snapshot_lock(self.directory, SNAPSHOT_NAME):
+            generation = current_generation(self.directory, SNAPSHOT_NAME)
+            if generation is not None and (self.base is None or generation != self.base.generation):
+                try:
+                    snapshot = load_snapshot(self.directory, SNAPSHOT_NAME, SNAPSHOT_VERSION, verify=True)
+                    view = TrendSnapshot(snapshot, self.grid_size)
+                    view.check()
+                    self._rebase(view, verified=True)
+                except SnapshotError as e:
+                    logger.warning("Overwriting unreadable trend snapshot %s: %s", generation, e)
+
+            arrays, meta = self.export_arrays(now)
+            save_snapshot(self.directory, SNAPSHOT_NAME, arrays, meta, SNAPSHOT_VERSION, lock=False)
+            written = load_snapshot(self.directory, SNAPSHOT_NAME, SNAPSHOT_VERSION)
+            self._rebase(TrendSnapshot(written, self.grid_size), verified=True)
+        return True
+
+    def export_arrays(self, now: Optional[datetime] = None) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Union base and delta, drop everything past the retention horizon, and lay it out as arrays"""
+        with self.lock:
+            base = self.base
+            events = dict(self.events)
+            status = dict(self.status)
+            horizon = day_index(now or datetime.now(timezone.utc)) - RETENTION_DAYS
+            if self.pruned_through is not None:
+                horizon = max(horizon, self.pruned_through)
+
+        if base is not None:
+            for event, value in base.events():
+                events.setdefault(event, value)
+            for issue_id, (seq, day) in base.statuses():
+                if issue_id not in status or status[issue_id][0] < seq:
+                    status[issue_id] = (seq, day)
+
+        events = {event: value for event, value in events.items() if value[0] > horizon}
+        status = {issue_id: value for issue_id, value in status.items() if value[1] > horizon}
+        return build_snapshot_arrays(events, status, self.grid_size, horizon)
+
+    def _rebase(self, base: TrendSnapshot, verified: bool) -> None:
+        """Serve `base` and keep only the delta entries it does not already contain"""
+        with self.lock:
+            self.base = base
+            self.base_verified = verified
+            if base.pruned_through is not None and (self.pruned_through is None or base.pruned_through > self.pruned_through):
+                self.pruned_through = base.pruned_through
+
+            events = [
+                (event, value) for event, value in self.events.items()
+                if not base.has_event(*event)
+            ]
+            self.status = {
+                issue_id: value for issue_id, value in self.status.items()
+                if (base.status(issue_id) or (-1, 0))[0] < value[0]
+            }
+            self.events, self.opened, self.resolved = {}, {}, {}
+            for event, value in events:
+                self._count_event(event, value)
+            self.dirty = bool(self.events or self.status)
+
+    def _drop_base(self, base: TrendSnapshot, error: Exception) -> None:
+        """Stop serving a base found to be corrupt; the next flush rewrites the snapshot"""
+        with self.lock:
+            if self.base is not base:
+                return
+            logger.warning("Dropping corrupt trend snapshot %s: %s", base.generation, error)
+            self.base = None
+            self.base_verified = True
+            self.rejected_generation = base.generation
+            self.dirty = True
+
+    def cell_center(self, cell: Tuple[int, int]) -> Dict:
+        """Center coordinates of a grid cell"""
+        return {
+            "lng": round((cell[0] + 0.5) * self.grid_size, 6),
+            "lat": round((cell[1] + 0.5) * self.grid_size, 6)
+        }
+
+    def get_trends(
+        self,
+        window: str = 'week',
+        category: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        Compare the current window with the one before it for every (cell, category).
+
+        Windows cover completed days only (ending yesterday), so a partial day
+        is never compared against a full one. Runs in time proportional to the
+        number of day rows in the two windows, read from the memory-mapped
+        base plus the in-memory delta.
+        """
+        if window not in WINDOW_DAYS:
+            raise ValueError(f"Unknown window '{window}', expected one of {list(WINDOW_DAYS)}")
+
+        days = WINDOW_DAYS[window]
+        last_complete = day_index(now or datetime.now(timezone.utc)) - 1
+
+        with self.lock:
+            base = self.base
+            current = self._window_counts(self.opened, last_complete - days, last_complete)
+            previous = self._window_counts(self.opened, last_complete - 2 * days, last_complete - days)
+            resolved = self._window_counts(self.resolved, last_complete - days, last_complete)
+
+        # The base is immutable, so it is read outside the lock
+        if base is not None:
+            try:
+                base_current, base_resolved = base.window_counts(last_complete - days, last_complete)
+                base_previous, _ = base.window_counts(last_complete - 2 * days, last_complete - days)
+            except SnapshotError as e:
+                self._drop_base(base, e)
+            else:
+                current.update(base_current)
+                previous.update(base_previous)
+                resolved.update(base_resolved)
+
+        trends = []
+        for key in set(current) | set(previous) | set(resolved):
+            cell, key_category = key
+            if category and key_category != category:
+                continue
+
+            current_count = current.get(key, 0)
+            previous_count = previous.get(key, 0)
+            delta = current_count - previous_count
+
+            if delta > 0:
+                trend = "growing"
+            elif delta < 0:
+                trend = "shrinking"
+            else:
+                trend = "stable"
+
+            center = self.cell_center(cell)
+            trends.append({
+                "cell": self.cell_name([center['lng'], center['lat']]),
+                "center": center,
+                "category": key_category,
+                "current_count": current_count,
+                "previous_count": previous_count,
+                # Counts every closing status (resolved and rejected)
+                "resolved_count": resolved.get(key, 0),
+                "net_change": current_count - resolved.get(key, 0),
+                "rate_per_day": round(delta / days, 3),
+                "growth_rate": round(delta / max(previous_count, 1), 3),
+                "trend": trend
+            })
+
+        trends.sort(key=lambda x: x['rate_per_day'], reverse=True)
+        return trends
+
+    def predict(
+        self,
+        window: str = 'month',
+        cells: Optional[set] = None,
+        category: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Project growing cells forward by one window using their current rate"""
+        return predictions_from_trends(self.get_trends(window, category, now), window, cells)
+
+def predictions_from_trends(trends: List[Dict], window: str, cells: Optional[set] = None) -> List[Dict]:
+    """Turn already computed trends into predictions, without re-reading the buckets"""
+    days = WINDOW_DAYS[window]
+    predictions = []
+
+    for trend in trends:
+        if trend['trend'] != 'growing':
+            continue
+        if cells is not None and trend['cell'] not in cells:
+            continue
+
+        projected = trend['current_count'] + trend['rate_per_day'] * days
+        predictions.append({
+            "location": trend['center'],
+            "predicted_category": trend['category'],
+            "confidence": round(min(0.95, 0.5 + 0.05 * trend['current_count']), 2),
+            "projected_count": int(round(projected)),
+            "rate_per_day": trend['rate_per_day'],
+            "timeframe": f"next {days} days",
+            "recommendation": f"Rising {trend['category']} reports in this area - schedule proactive maintenance"
+        })
+
+    return predictions
+
+# Shared aggregator for the running service
+trend_aggregator = TrendAggregator()
@@ -0,0 +1,118 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import services.hotspot_analyzer as hotspot_analyzer
+from services.hotspot_analyzer import (
+    analyze_hotspots,
+    batch_shards,
+    cell_key,
+    fold_small_shards,
+    merge_boundary_clusters,
+    partition_issues,
+)
+
+def make_issue(lng, lat, **fields):
+    issue = {"location": {"coordinates": [lng, lat]}, "category": "road", "priority": 5, "status": "pending"}
+    issue.update(fields)
+    return issue
+
+def make_cluster(region, lng, lat, count, priority=5.0):
+    return {
+        "id": 0,
+        "region": region,
+        "center": {"lng": lng, "lat": lat},
+        "issue_count": count,
+        "dominant_category": "road",
+        "category_distribution": {"road": count},
+        "avg_priority": priority,
+        "pending_issues": count,
+        "risk_level": "low"
+    }
+
+def test_partition_prefers_ward_then_city_then_grid():
+    shards = partition_issues([
+        make_issue(73.8, 18.5, ward="A", city="pune"),
+        make_issue(73.8, 18.5, city="pune"),
+        make_issue(73.8, 18.5),
+        {"location": {"coordinates": ["x", "y"]}},
+        {"title": "no location"},
+    ])
+
+    assert set(shards) == {"ward:A", "city:pune", cell_key([73.8, 18.5])}
+    assert all(len(coords) == 1 for coords, _ in shards.values())
+
+def test_region_scope_analyzes_only_that_shard_even_when_small():
+    issues = [make_issue(73.8 + i / 100, 18.5, ward="A") for i in range(10)]
+    issues += [make_issue(72.8, 19.0, ward="B", priority=10), make_issue(72.801, 19.0, ward="B", priority=10)]
+
+    result = analyze_hotspots(issues, region="ward:B")
+
+    assert result["regions_analyzed"] == 1
+    assert result["total_issues_analyzed"] == 2
+    assert [c["region"] for c in result["clusters"]] == ["ward:B"]
+    assert result["clusters"][0]["avg_priority"] == 10
+
+def test_small_ward_shards_are_folded_into_their_grid_cell():
+    issues = [make_issue(73.8 + i / 1000, 18.5, ward=f"w{i}") for i in range(6)]
+
+    shards = fold_small_shards(partition_issues(issues))
+    result = analyze_hotspots(issues)
+
+    assert list(shards) == [cell_key([73.8, 18.5])]
+    assert result["total_issues_analyzed"] == 6
+    assert sum(c["issue_count"] for c in result["clusters"]) + result["isolated_issues"] == 6
+    assert result["clusters"]
+
+def test_excluded_issues_are_reported():
+    issues = [make_issue(73.8, 18.5), make_issue(73.801, 18.5), make_issue(80.0, 10.0)]
+    issues += [{"location": {"coordinates": [None, 1]}}, {"title": "no location"}]
+
+    result = analyze_hotspots(issues)
+
+    assert result["issues_without_location"] == 2
+    assert result["isolated_issues"] == 1
+    assert result["total_issues_analyzed"] == 3
+
+def test_boundary_clusters_from_neighbouring_cells_are_merged():
+    clusters = [
+        make_cluster("grid:1:1", 0.99, 0.7, 4, priority=8),
+        make_cluster("grid:2:1", 1.01, 0.7, 6, priority=3),
+        make_cluster("grid:5:5", 2.7, 2.7, 3),
+        make_cluster("ward:A", 1.0, 0.7, 2),
+    ]
+
+    merged = merge_boundary_clusters(clusters)
+
+    assert len(merged) == 3
+    combined = next(c for c in merged if c["issue_count"] == 10)
+    assert combined["region"] == "grid:2:1"
+    assert combined["avg_priority"] == 5.0
+    assert abs(combined["center"]["lng"] - 1.002) < 1e-9
+
+def test_batch_shards_balances_point_counts():
+    jobs = [(str(i), [[0, 0]] * n, []) for i, n in enumerate([100, 50, 40, 30, 20, 10])]
+
+    batches = batch_shards(jobs, 2)
+
+    assert sorted(sum(len(job[1]) for job in batch) for batch in batches) == [120, 130]
+    assert len(batch_shards(jobs[:1], 4)) == 1
+
+def test_broken_pool_falls_back_and_is_replaced(monkeypatch):
+    class BrokenExecutor:
+        def map(self, *args):
+            raise BrokenProcessPool("worker died")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    broken = BrokenExecutor()
+    monkeypatch.setattr(hotspot_analyzer, "_executor", broken)
+    monkeypatch.setattr(hotspot_analyzer, "PARALLEL_MIN_POINTS", 0)
+    monkeypatch.setattr(hotspot_analyzer, "HOTSPOT_WORKERS", 2)
+
+    issues = [make_issue(73.8 + i / 100, 18.5, city="pune") for i in range(5)]
+    issues += [make_issue(72.8 + i / 100, 19.0, city="mumbai") for i in range(5)]
+    result = analyze_hotspots(issues)
+
+    assert result["total_issues_analyzed"] == 10
+    assert broken.shut_down
+    assert hotspot_analyzer._executor is None
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from services.snapshot_store import SnapshotError, current_generation, load_snapshot, save_snapshot
+from services.trend_aggregator import SNAPSHOT_NAME, SNAPSHOT_VERSION, TrendAggregator
+from tests.test_trend_aggregator import NOW, make_issue
+
+def generation_dir(directory):
+    return os.path.join(directory, SNAPSHOT_NAME, current_generation(directory, SNAPSHOT_NAME))
+
+def trend_counts(aggregator):
+    return sorted(
+        (t["cell"], t["category"], t["current_count"], t["resolved_count"])
+        for t in aggregator.get_trends("week", now=NOW)
+    )
+
+def saved_aggregator(directory, issues):
+    aggregator = TrendAggregator()
+    aggregator.attach(directory)
+    aggregator.ingest(issues, NOW)
+    assert aggregator.flush(NOW)
+    return aggregator
+
+def test_round_trip_serves_queries_from_the_mapped_snapshot(tmp_path):
+    issues = [make_issue("a"), make_issue("b", category="water"), make_issue("c", status="resolved")]
+    writer = saved_aggregator(str(tmp_path), issues)
+
+    reader = TrendAggregator()
+    assert reader.attach(str(tmp_path))
+
+    assert isinstance(reader.base.arrays["day_keys"], np.memmap)
+    assert reader.events == {} and not reader.base_verified
+    assert trend_counts(reader) == trend_counts(writer)
+    assert reader.verify() and reader.base_verified
+
+    # Statuses come from the base, so replays are no-ops and reopens continue the sequence
+    assert reader.ingest(issues, NOW) == 0
+    assert reader.record_issue(make_issue("c", status="pending", updatedAt=NOW.isoformat()), NOW)
+    assert reader.status == {"c": (2, reader.status["c"][1])}
+
+def test_workers_merge_on_write_and_pick_up_new_generations(tmp_path):
+    first = TrendAggregator()
+    second = TrendAggregator()
+    first.attach(str(tmp_path))
+    second.attach(str(tmp_path))
+
+    first.ingest([make_issue("a"), make_issue("shared")], NOW)
+    second.ingest([make_issue("b", category="water"), make_issue("shared")], NOW)
+    assert first.flush(NOW)
+    assert second.flush(NOW)
+
+    # The first worker never saw "b" but adopts the merged generation without an ingest
+    assert first.refresh()
+    assert first.events == {}
+    assert trend_counts(first) == trend_counts(second)
+    assert sum(t[2] for t in trend_counts(first)) == 3
+
+def test_lazy_checksum_failure_drops_base_and_rewrites(tmp_path):
+    saved_aggregator(str(tmp_path), [make_issue("a")])
+    opened = np.load(os.path.join(generation_dir(str(tmp_path)), "day_opened.npy"), mmap_mode="r+")
+    opened[0] += 5
+    opened.flush()
+    del opened
+
+    aggregator = TrendAggregator()
+    assert aggregator.attach(str(tmp_path))
+    assert not aggregator.verify()
+    assert aggregator.base is None and aggregator.dirty
+
+    assert aggregator.flush(NOW)
+    load_snapshot(str(tmp_path), SNAPSHOT_NAME, SNAPSHOT_VERSION, verify=True)
+
+def test_rejects_mismatched_version_and_grid(tmp_path):
+    saved_aggregator(str(tmp_path), [make_issue("a")])
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(str(tmp_path), SNAPSHOT_NAME, SNAPSHOT_VERSION + 1)
+    with pytest.raises(SnapshotError):
+        TrendAggregator(grid_size=0.2).attach(str(tmp_path))
+
+@pytest.mark.parametrize("corrupt", [
+    lambda manifest: [],
+    lambda manifest: {**manifest, "arrays": {"events": None}},
+    lambda manifest: {**manifest, "arrays": {"../keys": manifest["arrays"]["keys"]}},
+    lambda manifest: {**manifest, "meta": []},
+    lambda manifest: {**manifest, "meta": {**manifest["meta"], "categories": None}}
+])
+def test_malformed_manifest_is_a_snapshot_error_and_gets_overwritten(tmp_path, corrupt):
+    saved_aggregator(str(tmp_path), [make_issue("a")])
+    manifest_path = os.path.join(generation_dir(str(tmp_path)), "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w") as f:
+        json.dump(corrupt(manifest), f)
+
+    aggregator = TrendAggregator()
+    with pytest.raises(SnapshotError):
+        aggregator.attach(str(tmp_path))
+
+    aggregator.ingest([make_issue("b")], NOW)
+    assert aggregator.flush(NOW)
+    assert TrendAggregator().attach(str(tmp_path))
+
+def test_rejects_non_integer_arrays(tmp_path):
+    aggregator = saved_aggregator(str(tmp_path), [make_issue("a")])
+    arrays, meta = aggregator.export_arrays(NOW)
+    arrays["keys"] = arrays["keys"].astype(np.float64)
+    save_snapshot(str(tmp_path), SNAPSHOT_NAME, arrays, meta, SNAPSHOT_VERSION)
+
+    with pytest.raises(SnapshotError):
+        TrendAggregator().attach(str(tmp_path))
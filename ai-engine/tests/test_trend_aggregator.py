@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+from services.hotspot_analyzer import cell_key
+from services.trend_aggregator import RETENTION_DAYS, TrendAggregator
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+def make_issue(issue_id, days_ago=1, category="road", lng=73.85, **fields):
+    issue = {
+        "_id": issue_id,
+        "location": {"coordinates": [lng, 18.52]},
+        "category": category,
+        "createdAt": (NOW - timedelta(days=days_ago)).isoformat(),
+        "status": "pending"
+    }
+    issue.update(fields)
+    return issue
+
+def week_trend(aggregator, **kwargs):
+    trends = aggregator.get_trends("week", now=NOW, **kwargs)
+    assert len(trends) == 1
+    return trends[0]
+
+def test_ingest_is_idempotent_and_skips_unusable_issues():
+    aggregator = TrendAggregator()
+    issues = [
+        make_issue("a"),
+        make_issue("b"),
+        make_issue(None),
+        {**make_issue("c"), "_id": None, "id": None},
+        {**make_issue("d"), "location": {"coordinates": ["x", "y"]}},
+        {**make_issue("e"), "location": {"coordinates": [None, 1]}},
+        make_issue("f"),
+    ]
+
+    assert aggregator.ingest(issues, NOW) == 3
+    assert aggregator.ingest(issues, NOW) == 0
+    assert week_trend(aggregator)["current_count"] == 3
+
+def test_every_close_and_reopen_is_counted_even_on_the_same_day():
+    aggregator = TrendAggregator()
+    issue = make_issue("a", days_ago=3)
+    resolved_at = (NOW - timedelta(days=2)).isoformat()
+
+    aggregator.record_issue(issue, NOW)
+    aggregator.record_issue({**issue, "status": "resolved", "resolvedAt": resolved_at}, NOW)
+    aggregator.record_issue({**issue, "status": "in-progress", "updatedAt": resolved_at}, NOW)
+    aggregator.record_issue({**issue, "status": "resolved", "resolvedAt": resolved_at}, NOW)
+
+    trend = week_trend(aggregator)
+    assert trend["current_count"] == 2
+    assert trend["resolved_count"] == 2
+    assert aggregator.status["a"][0] == 3
+
+def test_rejected_issues_are_closed():
+    aggregator = TrendAggregator()
+    aggregator.record_issue(make_issue("a", status="rejected", updatedAt=(NOW - timedelta(days=1)).isoformat()), NOW)
+
+    assert week_trend(aggregator)["resolved_count"] == 1
+
+def test_windows_compare_completed_days_only():
+    aggregator = TrendAggregator()
+    aggregator.ingest([make_issue("today", days_ago=0), make_issue("yesterday", days_ago=1)], NOW)
+    aggregator.ingest([make_issue("before", days_ago=2)], NOW)
+
+    trends = aggregator.get_trends("day", now=NOW)
+
+    assert [(t["current_count"], t["previous_count"], t["trend"]) for t in trends] == [(1, 1, "stable")]
+
+def test_issue_created_before_horizon_is_not_recorded():
+    aggregator = TrendAggregator()
+
+    assert not aggregator.record_issue(make_issue("old", days_ago=RETENTION_DAYS + 5), NOW)
+    assert aggregator.status == {}
+    assert not aggregator.dirty
+
+def test_trend_cells_have_their_own_prefix():
+    aggregator = TrendAggregator()
+    aggregator.record_issue(make_issue("a"), NOW)
+
+    cell = week_trend(aggregator)["cell"]
+
+    assert cell.startswith("trend:")
+    assert cell == aggregator.cell_name([73.85, 18.52])
+    assert cell != cell_key([73.85, 18.52])
+
+def test_predictions_respect_category_filter():
+    aggregator = TrendAggregator()
+    aggregator.ingest([make_issue("r1"), make_issue("r2", days_ago=2), make_issue("w1", category="water")], NOW)
+
+    predictions = aggregator.predict("week", category="water", now=NOW)
+
+    assert [p["predicted_category"] for p in predictions] == ["water"]